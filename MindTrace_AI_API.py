@@ -3,15 +3,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
+import hashlib
 import os
 
 from TraceSpecAdjustment.traceSpecAdjustment import analyze_requirement_changes
 from doclingAnalyzer.chat import ask_question
 from doclingAnalyzer.extraction import extract_document
 from doclingAnalyzer.chunking import extract_and_chunk
-from doclingAnalyzer.embedding import process_document_to_qdrant , delete_by_project_id
+from doclingAnalyzer.embedding import (
+    process_document_to_qdrant, delete_by_project_id, default_document_id,
+    list_documents, get_document_stats, replace_document,
+    delete_document as delete_document_points
+)
 from doclingAnalyzer.search import search_qdrant
+from serviceControl.admission import admit, limiters
+from serviceControl.cache import file_hash
 
 
 app = FastAPI(
@@ -35,20 +43,33 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # 🔹 Health check endpoint
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "service": "MindTrace AI Service"}
+    return {
+        "status": "healthy",
+        "service": "MindTrace AI Service",
+        "admission": {name: limiter.stats() for name, limiter in limiters.items()}
+    }
+
+
 
+def extract_uploaded_document(content: bytes, digest: str, filename: str) -> dict:
+    # Sauvegarder temporairement le fichier uploadé (nom unique par contenu)
+    temp_file = f"temp_{digest[:16]}_{filename}"
+    with open(temp_file, "wb") as f:
+        f.write(content)
+    try:
+        # Extraction (contient aussi document)
+        return extract_document(temp_file)
+    finally:
+        os.remove(temp_file)
 
 
 @app.post("/api/ai-analyze/extract-document")
 async def extract_pdf_endpoint(file: UploadFile = File(...)):
     try:
-        # Sauvegarder temporairement le fichier uploadé
-        temp_file = f"temp_{file.filename}"
-        with open(temp_file, "wb") as f:
-            f.write(await file.read())
-
-        # Extraction (contient aussi document)
-        result = extract_document(temp_file)
+        content = await file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        result = await admit("extraction", ("document", digest), extract_uploaded_document,
+                             content, digest, file.filename)
 
         # On supprime document uniquement du retour JSON
         safe_result = {
@@ -58,6 +79,8 @@ async def extract_pdf_endpoint(file: UploadFile = File(...)):
 
         return JSONResponse(content=safe_result)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -67,7 +90,8 @@ class PDFRequest(BaseModel):
 async def extract_and_chunk_endpoint(request: PDFRequest):
     try:
         # Appel de ta fonction
-        result = extract_and_chunk(request.url_or_path)
+        digest = await run_in_threadpool(file_hash, request.url_or_path)
+        result = await admit("extraction", ("chunks", digest), extract_and_chunk, request.url_or_path)
 
         # ⚠️ chunks non sérialisables → transformer en dict minimal
         safe_chunks = [
@@ -87,6 +111,8 @@ async def extract_and_chunk_endpoint(request: PDFRequest):
 
         return JSONResponse(content=safe_result)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -94,12 +120,18 @@ async def extract_and_chunk_endpoint(request: PDFRequest):
 class ProcessPDFRequest(BaseModel):
     url_or_path: str
     project_id: str
+    document_id: Optional[str] = None
 
 
 @app.post("/api/ai-analyze/process-document")
 async def process_pdf_endpoint(request: ProcessPDFRequest):
     try:
-        points = process_document_to_qdrant(request.url_or_path, request.project_id)
+        document_id = request.document_id or default_document_id(request.url_or_path)
+        digest = await run_in_threadpool(file_hash, request.url_or_path)
+        points = await admit(
+            "process-document", (digest, request.project_id, document_id),
+            process_document_to_qdrant, request.url_or_path, request.project_id, document_id
+        )
 
         safe_points = [
             {
@@ -112,10 +144,13 @@ async def process_pdf_endpoint(request: ProcessPDFRequest):
 
         return JSONResponse(content={
             "project_id": request.project_id,
+            "document_id": document_id,
             "num_chunks": len(safe_points),
             "points": safe_points
         })
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -126,13 +161,18 @@ class SearchRequest(BaseModel):
 @app.post("/api/ai-analyze/search")
 async def search_endpoint(request: SearchRequest):
     try:
-        results = search_qdrant(request.query, request.project_id, request.limit)
+        results = await admit(
+            "search", (request.project_id, request.query, request.limit),
+            search_qdrant, request.query, request.project_id, request.limit
+        )
         return {
             "query": request.query,
             "project_id": request.project_id,
             "num_results": len(results),
             "results": results
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -143,19 +183,20 @@ class QueryRequest(BaseModel):
     num_results: Optional[int] = 5
 
 @app.post("/api/ai-analyze/ask")
-def ask(req: QueryRequest):
+async def ask(req: QueryRequest):
     try:
-        result = ask_question(
-            question=req.query,
-            project_id=req.project_id,
-            num_results=req.num_results
+        result = await admit(
+            "ask", (req.project_id, req.query, req.num_results),
+            ask_question, req.query, req.project_id, req.num_results
         )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/ai-analyze/delete-project")
-async def delete_document(collection: str, project_id: str):
+def delete_document(collection: str, project_id: str):
     """
     Supprime tous les vecteurs liés à un doc_id dans une collection Qdrant
     """
@@ -165,6 +206,73 @@ async def delete_document(collection: str, project_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur suppression: {str(e)}")
 
+@app.get("/api/ai-analyze/projects/{project_id}/documents")
+def list_documents_endpoint(project_id: str):
+    """
+    Liste les documents indexés d'un projet avec leurs statistiques
+    """
+    try:
+        documents = list_documents(project_id)
+        return {"project_id": project_id, "num_documents": len(documents), "documents": documents}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/ai-analyze/projects/{project_id}/documents/{document_id}")
+def document_stats_endpoint(project_id: str, document_id: str):
+    """
+    Statistiques d'un document (nombre de chunks, pages, caractères, dates)
+    """
+    try:
+        stats = get_document_stats(project_id, document_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Document '{document_id}' introuvable dans le projet '{project_id}'")
+    return stats
+
+
+@app.delete("/api/ai-analyze/projects/{project_id}/documents/{document_id}")
+def delete_document_endpoint(project_id: str, document_id: str):
+    """
+    Supprime uniquement les vecteurs d'un document (par ID de point)
+    """
+    try:
+        num_deleted = delete_document_points(project_id, document_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur suppression: {str(e)}")
+    if not num_deleted:
+        raise HTTPException(status_code=404, detail=f"Document '{document_id}' introuvable dans le projet '{project_id}'")
+    return {"status": "ok", "project_id": project_id, "document_id": document_id, "num_deleted": num_deleted}
+
+
+class ReplaceDocumentRequest(BaseModel):
+    url_or_path: str
+
+
+@app.put("/api/ai-analyze/projects/{project_id}/documents/{document_id}")
+async def replace_document_endpoint(project_id: str, document_id: str, request: ReplaceDocumentRequest):
+    """
+    Remplace un document : seuls ses propres vecteurs sont réécrits ou supprimés
+    """
+    try:
+        digest = await run_in_threadpool(file_hash, request.url_or_path)
+        points = await admit(
+            "process-document", (digest, project_id, document_id),
+            replace_document, request.url_or_path, project_id, document_id
+        )
+        return {
+            "status": "ok",
+            "project_id": project_id,
+            "document_id": document_id,
+            "num_chunks": len(points)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 class RequirementChangeRequest(BaseModel):
     old_desc: str
     new_desc: str
@@ -174,8 +282,8 @@ async def analyze_spec_changes(request: RequirementChangeRequest):
     """
     Analyze requirement changes between two Jira ticket descriptions.
     """
-    changes = analyze_requirement_changes(
-        old_description=request.old_desc,
-        new_description=request.new_desc
+    changes = await admit(
+        "analyze-spec-changes", (request.old_desc, request.new_desc),
+        analyze_requirement_changes, request.old_desc, request.new_desc
     )
     return changes
\ No newline at end of file
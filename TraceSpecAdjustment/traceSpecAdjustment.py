@@ -1,10 +1,10 @@
-from openai import OpenAI
+from serviceControl.rate_limit import create_openai_client
 from dotenv import load_dotenv
 import json
 import re
 
 load_dotenv()
-openai_client = OpenAI()
+openai_client = create_openai_client()
 
 def analyze_requirement_changes(old_description: str, new_description: str) -> dict:
     """
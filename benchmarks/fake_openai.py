@@ -0,0 +1,144 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import array
+import base64
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+
+EMBEDDING_DIM = 1536
+
+# Réponse fixe pour les complétions : un JSON valide, pour que
+# analyze_requirement_changes puisse le parser comme la vraie réponse.
+COMPLETION_CONTENT = {
+    "summary_changes": "The client now wants the benchmark answer.",
+    "changes_details": [
+        {"type": "Modified feature", "description": "Deterministic benchmark change."}
+    ],
+    "recommendations": "None.",
+    "effort_estimation": {"effort_level": "Low", "estimated_hours": 1},
+    "cost_recalculation": {"impact_level": "Low", "reason": "Benchmark."}
+}
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> list[float]:
+    """Deterministic unit vector derived from the text hash."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _encode_base64(vector: list[float]) -> str:
+    # Le SDK OpenAI demande "base64" par défaut : float32 little-endian
+    return base64.b64encode(array.array("f", vector).tobytes()).decode("ascii")
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/embeddings and /v1/chat/completions implementation."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+
+        if self.path.endswith("/embeddings"):
+            time.sleep(server.embedding_latency)
+            inputs = request.get("input", "")
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            as_base64 = request.get("encoding_format") == "base64"
+            data = []
+            for i, text in enumerate(inputs):
+                vector = fake_embedding(str(text), server.embedding_dim)
+                data.append({
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": _encode_base64(vector) if as_base64 else vector
+                })
+            tokens = sum(len(str(t).split()) for t in inputs)
+            self._send_json(200, {
+                "object": "list",
+                "data": data,
+                "model": request.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+            })
+
+        elif self.path.endswith("/chat/completions"):
+            time.sleep(server.chat_latency)
+            self._send_json(200, {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(COMPLETION_CONTENT)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            })
+
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+def start_fake_openai(host: str = "127.0.0.1", port: int = 0,
+                      embedding_latency_ms: float = 0.0, chat_latency_ms: float = 0.0,
+                      embedding_dim: int = EMBEDDING_DIM) -> ThreadingHTTPServer:
+    """
+    Start the fake OpenAI server in a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: the running server (base URL via server.base_url)
+    """
+    server = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.embedding_latency = embedding_latency_ms / 1000
+    server.chat_latency = chat_latency_ms / 1000
+    server.embedding_dim = embedding_dim
+    server.base_url = f"http://{host}:{server.server_address[1]}/v1"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic local stand-in for the OpenAI API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=0.0)
+    parser.add_argument("--embedding-dim", type=int, default=EMBEDDING_DIM)
+    args = parser.parse_args()
+
+    server = start_fake_openai(args.host, args.port, args.embedding_latency_ms,
+                               args.chat_latency_ms, args.embedding_dim)
+    print(f"Fake OpenAI listening on {server.base_url} (set OPENAI_BASE_URL to this value)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+"""
+Offline benchmark / load test of every endpoint of MindTrace_AI_API.
+
+OpenAI is replaced by the deterministic server of benchmarks/fake_openai.py and
+Qdrant by an in-memory instance (or a local container with --qdrant-url), so
+the whole run works on a laptop without network access. The Docling and gpt2
+models must already be in the Hugging Face cache.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --iterations 20 --concurrency 4 \
+        --embedding-latency-ms 30 --chat-latency-ms 300 --output bench_output.json
+
+By default the app runs in this process with uvicorn. To measure the
+production mode, --workers starts `python main.py --workers N` for each
+given count and compares their throughput; the workers need a shared Qdrant:
+    python -m benchmarks.run_benchmarks --workers 1,2 --concurrency 8 \
+        --qdrant-url http://localhost:6333 --openai-rps 0
+
+--base-url benchmarks a service that is already running on this machine (it
+reads the sample PDFs by path), started with OPENAI_BASE_URL pointing at
+`python -m benchmarks.fake_openai`:
+    python -m benchmarks.run_benchmarks --base-url http://127.0.0.1:8000
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.fake_openai import start_fake_openai
+from benchmarks.sample_pdfs import write_sample_pdfs
+
+QUERIES = [
+    "What does the client want for the login feature?",
+    "Which sprint contains the security review?",
+    "Estimate the effort of the database migration.",
+    "Who owns the deployment of the search service?",
+]
+OLD_DESC = "L'utilisateur peut créer un compte et se connecter par e-mail."
+NEW_DESC = "L'utilisateur peut créer un compte, se connecter par e-mail ou via Google."
+
+
+def unique_query(i: int) -> str:
+    # Texte différent à chaque itération : ni cache ni coalescing ne masquent le vrai chemin
+    return f"{QUERIES[i % len(QUERIES)]} (request {i})"
+
+
+def _process_tree(pid: int) -> list[int]:
+    """pid and all its descendants (gunicorn master, workers, conversion pools)."""
+    pids = [pid]
+    for parent in pids:
+        try:
+            for task in os.listdir(f"/proc/{parent}/task"):
+                with open(f"/proc/{parent}/task/{task}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def _current_rss_mb(pid="self"):
+    """
+    Resident memory in MB of this process ("self"), or of the process tree of
+    `pid` (None if it can't be read, or if `pid` is None).
+    """
+    if pid is None:
+        return None
+    pids = ["self"] if pid == "self" else _process_tree(pid)
+    try:
+        total = 0
+        for p in pids:
+            with open(f"/proc/{p}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        return total / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        process = psutil.Process() if pid == "self" else psutil.Process(pid)
+        processes = [process] + ([] if pid == "self" else process.children(recursive=True))
+        return sum(p.memory_info().rss for p in processes) / 2**20
+    except (ImportError, OSError):
+        return None
+
+
+class RSSSampler:
+    """Samples the RSS of `pid` (see _current_rss_mb) in the background to get the peak of a scenario."""
+
+    def __init__(self, pid="self", interval: float = 0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = _current_rss_mb(pid)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = _current_rss_mb(self.pid)
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def run_scenario(name: str, call, iterations: int, concurrency: int, warmup: int = 0, pid="self") -> dict:
+    """
+    Run `call(session, i)` `iterations` times with `concurrency` threads.
+    Memory is measured on `pid`: this process, the service's process tree, or None.
+
+    Returns:
+        dict: latency percentiles (ms), throughput, errors and memory of the scenario
+    """
+    import requests
+
+    local = threading.local()
+
+    def timed(i):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = call(local.session, i)
+            ok = response.status_code < 400
+            body = response.json() if ok else None
+        except Exception:
+            ok, body = False, None
+        return time.perf_counter() - start, ok, body
+
+    for i in range(warmup):
+        timed(i)
+
+    rss_before = _current_rss_mb(pid)
+    with RSSSampler(pid) as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, range(iterations)))
+        elapsed = time.perf_counter() - start
+
+    latencies = [r[0] * 1000 for r in results]
+    errors = sum(1 for r in results if not r[1])
+    rss_after = _current_rss_mb(pid)
+    return {
+        "endpoint": name,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": iterations / elapsed if elapsed else None,
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies) if latencies else float("nan"),
+        "rss_before_mb": rss_before,
+        "rss_after_mb": rss_after,
+        "rss_peak_mb": sampler.peak,
+        "bodies": [r[2] for r in results],
+    }
+
+
+def start_api(host: str, port: int):
+    """Start the FastAPI app with uvicorn in a background thread."""
+    import uvicorn
+    from MindTrace_AI_API import app
+
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def use_qdrant(location: str):
+    """Point every module-level Qdrant client of the service at the same local instance."""
+    from qdrant_client import QdrantClient
+    import doclingAnalyzer.chat
+    import doclingAnalyzer.embedding
+    import doclingAnalyzer.search
+
+    if location == ":memory:":
+        client = QdrantClient(":memory:")
+    else:
+        client = QdrantClient(url=location)
+    for module in (doclingAnalyzer.embedding, doclingAnalyzer.search, doclingAnalyzer.chat):
+        module.qdrant_client = client
+    return client
+
+
+def start_service(workers: int, port: int, env: dict, timeout: float = 600.0):
+    """
+    Start the production entry point (python main.py --workers N) in a
+    subprocess and wait until /health answers.
+    """
+    import requests
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+        cwd=root, env=env
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"main.py --workers {workers} exited with code {process.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    stop_service(process)
+    raise RuntimeError(f"main.py --workers {workers} did not answer /health within {timeout:g}s")
+
+
+def stop_service(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_endpoints(base: str, pdfs: list, n: int, c: int, collection_name: str, run_id: str, pid="self") -> dict:
+    """
+    Run every scenario against the service at `base`. Project IDs are
+    prefixed with `run_id`, so several runs can share the same Qdrant.
+
+    Returns:
+        dict: {"ingest": ingest stats, "endpoints": per-endpoint results}
+    """
+    api = f"{base}/api/ai-analyze"
+    project_ids = [f"bench-{run_id}-{i}" for i in range(len(pdfs))]
+    document_ids = [f"doc-{i}" for i in range(len(pdfs))]
+
+    def scenario(name, call, iterations, warmup=0):
+        return run_scenario(name, call, iterations, c, warmup=warmup, pid=pid)
+
+    def upload(session, i):
+        with open(pdfs[i % len(pdfs)], "rb") as f:
+            return session.post(f"{api}/extract-document", files={"file": (f"bench_{i}.pdf", f, "application/pdf")})
+
+    endpoints = []
+    endpoints.append(scenario("GET /health", lambda s, i: s.get(f"{base}/health"), n, warmup=1))
+    endpoints.append(scenario("POST /extract-document", upload, len(pdfs), warmup=1))
+    endpoints.append(scenario(
+        "POST /extract-and-chunk",
+        lambda s, i: s.post(f"{api}/extract-and-chunk", json={"url_or_path": pdfs[i]}),
+        len(pdfs)
+    ))
+
+    ingest = scenario(
+        "POST /process-document",
+        lambda s, i: s.post(f"{api}/process-document", json={
+            "url_or_path": pdfs[i], "project_id": project_ids[i], "document_id": document_ids[i]
+        }),
+        len(pdfs)
+    )
+    chunks = sum(b["num_chunks"] for b in ingest["bodies"] if b)
+    ingest_seconds = ingest["iterations"] / ingest["throughput_rps"]
+    endpoints.append(ingest)
+
+    endpoints.append(scenario(
+        "POST /search",
+        lambda s, i: s.post(f"{api}/search", json={
+            "query": unique_query(i), "project_id": project_ids[i % len(project_ids)], "limit": 3
+        }),
+        n, warmup=1
+    ))
+    endpoints.append(scenario(
+        "POST /ask",
+        lambda s, i: s.post(f"{api}/ask", json={
+            "query": unique_query(i), "project_id": project_ids[i % len(project_ids)], "num_results": 5
+        }),
+        n, warmup=1
+    ))
+    endpoints.append(scenario(
+        "POST /analyze-spec-changes",
+        lambda s, i: s.post(f"{api}/analyze-spec-changes", json={"old_desc": OLD_DESC, "new_desc": f"{NEW_DESC} (request {i})"}),
+        n, warmup=1
+    ))
+    endpoints.append(scenario(
+        "GET /projects/{id}/documents",
+        lambda s, i: s.get(f"{api}/projects/{project_ids[i % len(project_ids)]}/documents"),
+        n, warmup=1
+    ))
+    endpoints.append(scenario(
+        "GET /projects/{id}/documents/{id}",
+        lambda s, i: s.get(f"{api}/projects/{project_ids[i % len(pdfs)]}/documents/{document_ids[i % len(pdfs)]}"),
+        n, warmup=1
+    ))
+    endpoints.append(scenario(
+        "PUT /projects/{id}/documents/{id}",
+        lambda s, i: s.put(f"{api}/projects/{project_ids[i]}/documents/{document_ids[i]}",
+                           json={"url_or_path": pdfs[(i + 1) % len(pdfs)]}),
+        len(pdfs)
+    ))
+    endpoints.append(scenario(
+        "DELETE /projects/{id}/documents/{id}",
+        lambda s, i: s.delete(f"{api}/projects/{project_ids[i]}/documents/{document_ids[i]}"),
+        len(pdfs)
+    ))
+    endpoints.append(scenario(
+        "DELETE /delete-project",
+        lambda s, i: s.delete(f"{api}/delete-project",
+                              params={"collection": collection_name, "project_id": project_ids[i]}),
+        len(project_ids)
+    ))
+
+    for r in endpoints:
+        r.pop("bodies")
+
+    return {
+        "ingest": {
+            "documents": len(pdfs),
+            "chunks": chunks,
+            "seconds": ingest_seconds,
+            "documents_per_s": len(pdfs) / ingest_seconds if ingest_seconds else 0.0,
+            "chunks_per_s": chunks / ingest_seconds if ingest_seconds else 0.0,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def _fmt(value, spec: str) -> str:
+    # Valeur non mesurée (service externe) : "n/a" avec la même largeur
+    if value is None:
+        return format("n/a", spec.split(".")[0])
+    return format(value, spec)
+
+
+def print_report(report: dict):
+    for run in report["runs"]:
+        print(f"\n=== {run['label']} ===")
+        print(f"Startup of the service: {_fmt(run['startup_seconds'], '.2f')}s, "
+              f"RSS {_fmt(run['rss_after_startup_mb'], '.0f')} MB")
+        ingest = run["ingest"]
+        print(f"Ingest: {ingest['documents']} documents, {ingest['chunks']} chunks in {ingest['seconds']:.2f}s "
+              f"-> {ingest['documents_per_s']:.2f} docs/s, {ingest['chunks_per_s']:.1f} chunks/s\n")
+
+        header = f"{'endpoint':<42}{'n':>5}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'peak MB':>10}"
+        print(header)
+        print("-" * len(header))
+        for r in run["endpoints"]:
+            print(f"{r['endpoint']:<42}{r['iterations']:>5}{r['errors']:>5}{r['throughput_rps']:>9.2f}"
+                  f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}"
+                  f"{_fmt(r['rss_peak_mb'], '>10.0f')}")
+
+    if len(report["runs"]) > 1:
+        # Comparaison du débit (requêtes/s) entre les runs, endpoint par endpoint
+        print("\n=== Throughput (rps) ===")
+        labels = [run["label"] for run in report["runs"]]
+        header = f"{'endpoint':<42}" + "".join(f"{label:>14}" for label in labels)
+        print(header)
+        print("-" * len(header))
+        for index, r in enumerate(report["runs"][0]["endpoints"]):
+            print(f"{r['endpoint']:<42}" + "".join(
+                f"{run['endpoints'][index]['throughput_rps']:>14.2f}" for run in report["runs"]
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the MindTrace AI Service endpoints")
+    parser.add_argument("--iterations", type=int, default=20, help="requests per query endpoint")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--documents", type=int, default=3, help="number of sample PDFs to ingest")
+    parser.add_argument("--pages", type=int, default=3, help="pages per sample PDF")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=0.0)
+    parser.add_argument("--embedding-backend", default="openai", help="'openai' (fake server) or 'local'")
+    parser.add_argument("--qdrant-url", default=":memory:", help="':memory:' or e.g. http://localhost:6333")
+    parser.add_argument("--cache", action="store_true",
+                        help="enable the shared embedding/conversion/answer cache (off by default)")
+    parser.add_argument("--openai-rps", type=float,
+                        help="outgoing OpenAI requests/s of the service (0 = no limit; default: service default)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--base-url", help="benchmark an already running service instead of starting one")
+    parser.add_argument("--collection", help="collection used by --base-url (default: the backend's collection)")
+    parser.add_argument("--workers",
+                        help="comma-separated worker counts, e.g. 1,2: one run of 'python main.py --workers N' each")
+    parser.add_argument("--output", help="write the full report as JSON to this file")
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",")] if args.workers else []
+    if worker_counts and args.base_url:
+        parser.error("--workers and --base-url are exclusive")
+    if worker_counts and args.qdrant_url == ":memory:":
+        parser.error("--workers needs a Qdrant server shared by the workers (--qdrant-url)")
+
+    workdir = tempfile.mkdtemp(prefix="mindtrace-bench-")
+    pdfs = write_sample_pdfs(workdir, args.documents, args.pages)
+    n = args.iterations
+    c = args.concurrency
+    runs = []
+
+    if args.base_url:
+        # Service externe : lancé avec OPENAI_BASE_URL sur python -m benchmarks.fake_openai,
+        # sur la même machine (il lit les PDF par leur chemin)
+        from doclingAnalyzer.embedding_backends import get_embedding_backend
+        collection_name = args.collection or get_embedding_backend(args.embedding_backend).collection_name
+        run = run_endpoints(args.base_url.rstrip("/"), pdfs, n, c, collection_name, str(os.getpid()), pid=None)
+        runs.append({"label": args.base_url, "startup_seconds": None, "rss_after_startup_mb": None, **run})
+        fake_openai = None
+    else:
+        fake_openai = start_fake_openai(embedding_latency_ms=args.embedding_latency_ms,
+                                        chat_latency_ms=args.chat_latency_ms)
+        # Doit être fait avant l'import du service : les clients sont créés à l'import
+        os.environ["OPENAI_BASE_URL"] = fake_openai.base_url
+        os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+        os.environ["EMBEDDING_BACKEND"] = args.embedding_backend
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+        os.environ["DOCUMENT_MANIFEST_PATH"] = os.path.join(workdir, "document_manifest.sqlite3")
+        os.environ["CACHE_PATH"] = os.path.join(workdir, "cache.sqlite3")
+        os.environ["CACHE_ENABLED"] = "1" if args.cache else "0"
+        if args.openai_rps is not None:
+            os.environ["OPENAI_REQUESTS_PER_SECOND"] = str(args.openai_rps)
+        if args.qdrant_url.startswith("http://"):
+            os.environ["QDRANT_HTTPS"] = "0"
+        from doclingAnalyzer.embedding_backends import get_embedding_backend
+        collection_name = get_embedding_backend().collection_name
+
+    for workers in worker_counts:
+        # Cache propre à chaque run : un run ne profite pas des conversions du précédent
+        env = dict(os.environ, QDRANT_URL=args.qdrant_url,
+                   CACHE_PATH=os.path.join(workdir, f"cache-w{workers}.sqlite3"))
+        start = time.perf_counter()
+        process = start_service(workers, args.port, env)
+        try:
+            startup_seconds = time.perf_counter() - start
+            rss_after_startup = _current_rss_mb(process.pid)
+            run = run_endpoints(f"http://127.0.0.1:{args.port}", pdfs, n, c, collection_name,
+                                f"w{workers}", pid=process.pid)
+        finally:
+            stop_service(process)
+        runs.append({"label": f"{workers} worker(s)", "workers": workers, "startup_seconds": startup_seconds,
+                     "rss_after_startup_mb": rss_after_startup, **run})
+
+    if not runs:
+        start = time.perf_counter()
+        server, _ = start_api("127.0.0.1", args.port)
+        startup_seconds = time.perf_counter() - start
+        rss_after_startup = _current_rss_mb()
+        use_qdrant(args.qdrant_url)
+        try:
+            run = run_endpoints(f"http://127.0.0.1:{args.port}", pdfs, n, c, collection_name, "in-process")
+        finally:
+            server.should_exit = True
+        runs.append({"label": "in-process", "startup_seconds": startup_seconds,
+                     "rss_after_startup_mb": rss_after_startup, **run})
+
+    report = {"config": vars(args), "runs": runs}
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if fake_openai is not None:
+        fake_openai.shutdown()
+    failed = sum(r["errors"] for run in runs for r in run["endpoints"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+
+WORDS = (
+    "project requirement user account login password email client feature "
+    "deadline sprint backlog ticket priority review deploy service api "
+    "database report document search answer context cost effort estimate "
+    "release test module integration security performance latency team"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(rng: random.Random, page_no: int, lines_per_page: int) -> list[tuple[int, str]]:
+    lines = [(16, f"Section {page_no}: {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}")]
+    for _ in range(lines_per_page):
+        lines.append((11, " ".join(rng.choice(WORDS) for _ in range(10)).capitalize() + "."))
+    return lines
+
+
+def build_pdf(pages: int = 3, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """
+    Build a small text-only PDF without any third-party dependency.
+
+    Args:
+        pages: number of pages
+        lines_per_page: number of paragraph lines per page
+        seed: seed of the generated text (same seed -> same bytes)
+
+    Returns:
+        bytes: the PDF file content
+    """
+    rng = random.Random(seed)
+    objects: list[bytes] = []
+
+    # 1: catalog, 2: pages, 3: font, puis (page, contenu) pour chaque page
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for i, page_id in enumerate(page_ids):
+        y = 800
+        ops = []
+        for size, line in _page_lines(rng, i + 1, lines_per_page):
+            ops.append(f"BT /F1 {size} Tf 50 {y} Td ({_escape(line)}) Tj ET")
+            y -= size + 7
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(out)
+
+
+def write_sample_pdfs(directory: str, count: int = 3, pages: int = 3) -> list[str]:
+    """Write `count` deterministic sample PDFs into `directory` and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"sample_{i}.pdf")
+        with open(path, "wb") as f:
+            f.write(build_pdf(pages=pages, seed=i))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate deterministic sample PDFs")
+    parser.add_argument("directory")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=3)
+    args = parser.parse_args()
+
+    for path in write_sample_pdfs(args.directory, args.count, args.pages):
+        print(path)
@@ -1,6 +1,8 @@
 from qdrant_client import QdrantClient
 from qdrant_client.models import Filter, FieldCondition, MatchValue
-from openai import OpenAI
+from doclingAnalyzer.embedding_backends import get_embedding_backend
+from serviceControl.cache import ANSWER_CACHE_TTL, cache_key, project_version, shared_cache
+from serviceControl.rate_limit import create_openai_client
 from dotenv import load_dotenv
 import os
 
@@ -9,12 +11,17 @@ load_dotenv()
 # -----------------------------
 # OpenAI client
 # -----------------------------
-client = OpenAI()
+client = create_openai_client()
+
+# -----------------------------
+# Embedding backend (doit être le même que celui de l'ingestion)
+# -----------------------------
+embedding_backend = get_embedding_backend()
 
 # -----------------------------
 # Qdrant config
 # -----------------------------
-COLLECTION_NAME = "MindTrace-documents"
+COLLECTION_NAME = embedding_backend.collection_name
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
@@ -22,18 +29,14 @@ QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 qdrant_client = QdrantClient(
     url=QDRANT_URL,
     api_key=QDRANT_API_KEY,
-    https=True
+    https=os.getenv("QDRANT_HTTPS", "1") == "1"
 )
 
 
 def get_context(query: str, project_id: str, num_results: int = 5) -> list[dict]:
     """Search Qdrant collection filtered by project_id and return top chunks as context."""
 
-    query_vector = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=query
-    ).data[0].embedding
-
+    query_vector = embedding_backend.embed_query(query)
 
     results = qdrant_client.search(
         collection_name=COLLECTION_NAME,
@@ -73,6 +76,15 @@ def get_context(query: str, project_id: str, num_results: int = 5) -> list[dict]
 
 
 def ask_question(question: str, project_id: str, num_results: int = 5) -> dict:
+    # Réponse en cache tant que les documents du projet n'ont pas changé
+    answer_key = None
+    if ANSWER_CACHE_TTL > 0:
+        version = project_version(COLLECTION_NAME, project_id)
+        answer_key = cache_key(COLLECTION_NAME, project_id, version, question, num_results)
+        cached = shared_cache.get("answer", answer_key)
+        if cached is not None:
+            return cached
+
     contexts = get_context(question, project_id, num_results)
 
     context_text = "\n\n".join([
@@ -111,11 +123,14 @@ def ask_question(question: str, project_id: str, num_results: int = 5) -> dict:
 
     assistant_answer = response.choices[0].message.content
 
-    return {
+    result = {
         "question": question,
         "answer": assistant_answer,
         "contexts": contexts
     }
+    if answer_key:
+        shared_cache.set("answer", answer_key, result, ANSWER_CACHE_TTL)
+    return result
 
 
 
@@ -1,10 +1,13 @@
 from docling.chunking import HybridChunker
 from doclingAnalyzer.extraction import extract_document
+from doclingAnalyzer.embedding_backends import get_embedding_backend
 from transformers import AutoTokenizer
 
 
-MAX_TOKENS = 500
-tokenizer = AutoTokenizer.from_pretrained("gpt2")
+# Chunks limités à ce que le modèle d'embedding lit sans tronquer
+embedding_backend = get_embedding_backend()
+MAX_TOKENS = min(500, embedding_backend.max_input_tokens)
+tokenizer = embedding_backend.tokenizer or AutoTokenizer.from_pretrained("gpt2")
 
 def extract_and_chunk(path_url: str) -> dict:
     """
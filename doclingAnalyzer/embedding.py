@@ -1,25 +1,24 @@
 from typing import List
 from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, VectorParams, Distance, Filter , FieldCondition,MatchValue
-from transformers import AutoTokenizer
+from qdrant_client.models import PointStruct, PointIdsList, VectorParams, Distance, Filter , FieldCondition,MatchValue
 from doclingAnalyzer.chunking import extract_and_chunk
+from doclingAnalyzer.embedding_backends import get_embedding_backend
+from doclingAnalyzer.manifest import manifest
+from serviceControl.cache import bump_project_version
 from dotenv import load_dotenv
 import os
-from openai import OpenAI
 import uuid  # <-- pour générer des UUID
 
 load_dotenv()
 
-MAX_TOKENS = 500
-tokenizer = AutoTokenizer.from_pretrained("gpt2")
+DELETE_BATCH_SIZE = 1000
 
-# OpenAI client
-openai_client = OpenAI()
+# Embedding backend (OpenAI ou local), chacun avec sa propre collection
+embedding_backend = get_embedding_backend()
 
 # Qdrant config
 QDRANT_URL = os.getenv("QDRANT_URL")
-COLLECTION_NAME = "MindTrace-documents"
-VECTOR_SIZE = 1536
+COLLECTION_NAME = embedding_backend.collection_name
 
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
@@ -27,40 +26,91 @@ qdrant_client = QdrantClient(
     url=QDRANT_URL,
     api_key=QDRANT_API_KEY,
     timeout=120,
-    https=True
+    https=os.getenv("QDRANT_HTTPS", "1") == "1"
 )
 
 def get_embedding(text: str) -> List[float]:
-    """Create embedding via OpenAI."""
-    response = openai_client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
-    return response.data[0].embedding
+    """Create embedding via the configured backend."""
+    return embedding_backend.embed_query(text)
+
+
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """Create embeddings for several chunks at once (batched by the backend)."""
+    return embedding_backend.embed_documents(texts)
+
+def default_document_id(path_or_url: str) -> str:
+    """Stable document_id of a source, so processing it again targets the same points."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, path_or_url))
+
+
+def point_id(project_id: str, document_id: str, chunk_index: int) -> str:
+    """Deterministic point ID: a replace overwrites the chunks in place."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{project_id}/{document_id}/{chunk_index}"))
+
+
+def document_point_ids(project_id: str, document_id: str, num_chunks: int, start: int = 0) -> List[str]:
+    """Point IDs of the chunks `start`..`num_chunks - 1` of a document."""
+    return [point_id(project_id, document_id, index) for index in range(start, num_chunks)]
+
+
+_indexed_collections = set()
 
-def process_document_to_qdrant(path_or_url: str, project_id: str):
+def ensure_collection(collection_name: str = COLLECTION_NAME):
+    """Create the collection if needed, with keyword indexes on project_id and document_id."""
+    if collection_name in _indexed_collections:
+        return
+    created = False
+    if not qdrant_client.collection_exists(collection_name):
+        # create (et non recreate) : un autre worker a pu la créer entre-temps, sans l'effacer
+        try:
+            qdrant_client.create_collection(
+                collection_name=collection_name,
+                vectors_config=VectorParams(size=embedding_backend.vector_size, distance=Distance.COSINE)
+            )
+            created = True
+            print(f"Collection '{collection_name}' created in Qdrant.")
+        except Exception:
+            if not qdrant_client.collection_exists(collection_name):
+                raise
+    if created:
+        indexed_fields = set()
+    else:
+        collection = qdrant_client.get_collection(collection_name)
+        vectors_config = collection.config.params.vectors
+        existing_size = getattr(vectors_config, "size", None)
+        if existing_size != embedding_backend.vector_size:
+            raise ValueError(
+                f"Collection '{collection_name}' holds vectors of size {existing_size}, but the "
+                f"'{embedding_backend.name}' backend model '{embedding_backend.model_name}' produces "
+                f"{embedding_backend.vector_size}: use another collection or re-index it"
+            )
+        indexed_fields = set(collection.payload_schema or {})
+
+    for field_name in ("project_id", "document_id"):
+        if field_name not in indexed_fields:
+            qdrant_client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema="keyword",
+            )
+            print(f"Index on '{field_name}' created.")
+    _indexed_collections.add(collection_name)
+
+
+def process_document_to_qdrant(path_or_url: str, project_id: str, document_id: str = None):
+    document_id = document_id or default_document_id(path_or_url)
     data = extract_and_chunk(path_or_url)
     chunks = data["chunks"]
-    if not qdrant_client.collection_exists(COLLECTION_NAME):
-        qdrant_client.recreate_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE)
-        )
-        print(f"Collection '{COLLECTION_NAME}' created in Qdrant.")
-        qdrant_client.create_payload_index(
-            collection_name=COLLECTION_NAME,
-            field_name="project_id",
-            field_schema="keyword",
-        )
-        print("Index on 'project_id' created.")
+    ensure_collection(COLLECTION_NAME)
 
     # 3️⃣ Préparer les points
     points: List[PointStruct] = []
-    for chunk in chunks:
+    vectors = get_embeddings([chunk.text for chunk in chunks])
+    for index, (chunk, vector) in enumerate(zip(chunks, vectors)):
         text = chunk.text
-        vector = get_embedding(text)
         payload = {
             "project_id": project_id,
+            "document_id": document_id,
             "text": text,
             "filename": getattr(chunk.meta.origin, "filename", None),
             "page_numbers": [
@@ -71,16 +121,95 @@ def process_document_to_qdrant(path_or_url: str, project_id: str):
             ] or None,
             "title": chunk.meta.headings[0] if getattr(chunk.meta, "headings", []) else None,
         }
-        # ID valide: UUID
-        points.append(PointStruct(id=str(uuid.uuid4()), vector=vector, payload=payload))
+        points.append(PointStruct(id=point_id(project_id, document_id, index), vector=vector, payload=payload))
 
-    # 4️⃣ Upsert dans Qdrant
-    qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points)
+    # 4️⃣ Upsert + manifest sous le verrou du document : deux écritures concurrentes
+    # du même document ne peuvent pas supprimer les points l'une de l'autre
+    page_numbers = {page for p in points for page in (p.payload["page_numbers"] or [])}
+    with manifest.document_lock(COLLECTION_NAME, project_id, document_id):
+        previous = manifest.get_document(COLLECTION_NAME, project_id, document_id)
+        qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points)
 
-    print(f"{len(points)} chunks inserted for document {project_id}.")
+        # Un document ré-indexé plus court laisse des chunks en trop : on les retire
+        if previous and previous["num_chunks"] > len(points):
+            delete_points(COLLECTION_NAME, document_point_ids(
+                project_id, document_id, previous["num_chunks"], start=len(points)
+            ))
+
+        # 5️⃣ Manifest local : nombre de chunks (les IDs s'en déduisent) et stats
+        manifest.set_document(
+            COLLECTION_NAME, project_id, document_id,
+            len(points),
+            source=path_or_url,
+            filename=next((p.payload["filename"] for p in points if p.payload["filename"]), None),
+            num_pages=len(page_numbers),
+            num_characters=sum(len(p.payload["text"] or "") for p in points),
+        )
+        bump_project_version(COLLECTION_NAME, project_id)
+
+    print(f"{len(points)} chunks inserted for document {document_id} of project {project_id}.")
     return points
 
 
+def replace_document(path_or_url: str, project_id: str, document_id: str):
+    """
+    Re-index one document from a new source. Only the points of this
+    document are written (overwritten in place) or deleted.
+    """
+    return process_document_to_qdrant(path_or_url, project_id, document_id)
+
+
+def delete_points(collection_name: str, point_ids: list, batch_size: int = DELETE_BATCH_SIZE):
+    """Delete points by ID, in batches (no payload filter scan)."""
+    for start in range(0, len(point_ids), batch_size):
+        qdrant_client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=point_ids[start:start + batch_size])
+        )
+
+
+def _document_filter(project_id: str, document_id: str) -> Filter:
+    return Filter(
+        must=[
+            FieldCondition(key="project_id", match=MatchValue(value=project_id)),
+            FieldCondition(key="document_id", match=MatchValue(value=document_id)),
+        ]
+    )
+
+
+def list_documents(project_id: str, collection_name: str = COLLECTION_NAME) -> List[dict]:
+    """List the documents of a project with their stats (from the local manifest)."""
+    return list(manifest.list_documents(collection_name, project_id).values())
+
+
+def get_document_stats(project_id: str, document_id: str, collection_name: str = COLLECTION_NAME):
+    """Stats of one document, or None if it is unknown."""
+    return manifest.get_document(collection_name, project_id, document_id)
+
+
+def delete_document(project_id: str, document_id: str, collection_name: str = COLLECTION_NAME) -> int:
+    """
+    Delete all chunks of one document.
+
+    Returns:
+        int: number of deleted points (0 if the document is unknown)
+    """
+    with manifest.document_lock(collection_name, project_id, document_id):
+        entry = manifest.remove_document(collection_name, project_id, document_id)
+        if entry is not None:
+            delete_points(collection_name, document_point_ids(project_id, document_id, entry["num_chunks"]))
+            bump_project_version(collection_name, project_id)
+            return entry["num_chunks"]
+
+        # Document absent du manifest (indexé ailleurs) : suppression par filtre indexé
+        document_filter = _document_filter(project_id, document_id)
+        count = qdrant_client.count(collection_name=collection_name, count_filter=document_filter, exact=True).count
+        if count:
+            qdrant_client.delete(collection_name=collection_name, points_selector=document_filter)
+            bump_project_version(collection_name, project_id)
+        return count
+
+
 def create_project_id_index(collection_name: str):
     """
     Creates an index on the 'project_id' field in the given collection.
@@ -108,6 +237,8 @@ def delete_by_project_id(collection_name: str, project_id: str):
             ]
         )
     )
+    manifest.remove_project(collection_name, project_id)
+    bump_project_version(collection_name, project_id)
     print(f"✅ All vectors with project_id='{project_id}' have been removed from the collection '{collection_name}'.")
     return True
 
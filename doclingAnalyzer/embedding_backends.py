@@ -0,0 +1,278 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from dotenv import load_dotenv
+from serviceControl.cache import EMBEDDING_CACHE_TTL, cache_key, shared_cache
+from serviceControl.rate_limit import create_openai_client
+import array
+import os
+import re
+import threading
+
+load_dotenv()
+
+# -----------------------------
+# Backend config
+# -----------------------------
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+BASE_COLLECTION_NAME = "MindTrace-documents"
+
+DEFAULT_OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", DEFAULT_OPENAI_EMBEDDING_MODEL)
+# Taille des vecteurs pour un modèle absent de OpenAIEmbeddingBackend.VECTOR_SIZES
+OPENAI_EMBEDDING_DIM = os.getenv("OPENAI_EMBEDDING_DIM")
+OPENAI_BATCH_SIZE = int(os.getenv("OPENAI_EMBEDDING_BATCH_SIZE", "64"))
+
+DEFAULT_LOCAL_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", DEFAULT_LOCAL_EMBEDDING_MODEL)
+LOCAL_EMBEDDING_RUNTIME = os.getenv("LOCAL_EMBEDDING_RUNTIME", "torch")  # "torch" ou "onnx"
+LOCAL_EMBEDDING_RUNTIMES = ("torch", "onnx")
+LOCAL_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", str(min(4, os.cpu_count() or 1))))
+# Threads de calcul par appel à encode() : les cœurs sont répartis entre les LOCAL_EMBEDDING_THREADS
+LOCAL_EMBEDDING_INTRA_OP_THREADS = int(os.getenv(
+    "LOCAL_EMBEDDING_INTRA_OP_THREADS", str(max(1, (os.cpu_count() or 1) // LOCAL_EMBEDDING_THREADS))
+))
+
+
+def _model_slug(model_name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", model_name.lower()).strip("-")
+
+
+class EmbeddingBackend(ABC):
+    """
+    Interface shared by all embedding backends.
+
+    Each backend and model owns its Qdrant collection so that vectors of
+    different sizes (or from different models) never end up in the same
+    collection.
+    """
+
+    name = "base"
+    model_name = None
+    default_model_name = None
+
+    @property
+    @abstractmethod
+    def vector_size(self) -> int:
+        ...
+
+    @property
+    @abstractmethod
+    def max_input_tokens(self) -> int:
+        """Longest input (in `tokenizer` tokens) the model embeds without truncation."""
+
+    @property
+    def tokenizer(self):
+        """Tokenizer to size the chunks with (None: the chunker's default gpt2 tokenizer)."""
+        return None
+
+    @property
+    def collection_name(self) -> str:
+        collection_name = f"{BASE_COLLECTION_NAME}-{self.name}"
+        if self.model_name != self.default_model_name:
+            collection_name += f"-{_model_slug(self.model_name)}"
+        return collection_name
+
+    @abstractmethod
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, reusing vectors already in the shared cache
+        (computed earlier, possibly by another worker).
+        """
+        keys = [cache_key(self.name, self.model_name, text) for text in texts]
+        cached = shared_cache.get_many("embedding", list(set(keys)))
+
+        # Textes absents du cache, sans doublons
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self._embed(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            shared_cache.set_many(
+                "embedding",
+                {key: array.array("f", vector) for key, vector in computed.items()},
+                EMBEDDING_CACHE_TTL
+            )
+            cached.update(computed)
+
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """Embeddings through the OpenAI API, several chunks per request."""
+
+    name = "openai"
+    default_model_name = DEFAULT_OPENAI_EMBEDDING_MODEL
+    VECTOR_SIZES = {
+        "text-embedding-3-small": 1536,
+        "text-embedding-3-large": 3072,
+        "text-embedding-ada-002": 1536,
+    }
+
+    MAX_INPUT_TOKENS = 8191
+
+    def __init__(self, model: str = OPENAI_EMBEDDING_MODEL, batch_size: int = OPENAI_BATCH_SIZE,
+                 vector_size: int = None):
+        if vector_size is None and OPENAI_EMBEDDING_DIM:
+            vector_size = int(OPENAI_EMBEDDING_DIM)
+        if vector_size is None and model not in self.VECTOR_SIZES:
+            raise ValueError(
+                f"Unknown vector size for OpenAI embedding model '{model}': "
+                f"set OPENAI_EMBEDDING_DIM (known models: {sorted(self.VECTOR_SIZES)})"
+            )
+        self.model_name = model
+        self.batch_size = batch_size
+        self._vector_size = vector_size or self.VECTOR_SIZES[model]
+        self._client = None
+
+    @property
+    def client(self):
+        # Créé au premier appel : rien d'ouvert si le backend est instancié avant un fork
+        if self._client is None:
+            self._client = create_openai_client()
+        return self._client
+
+    @property
+    def vector_size(self) -> int:
+        return self._vector_size
+
+    @property
+    def max_input_tokens(self) -> int:
+        return self.MAX_INPUT_TOKENS
+
+    @property
+    def collection_name(self) -> str:
+        # Collection historique du modèle par défaut, conservée pour ne pas réindexer l'existant
+        if self.model_name == self.default_model_name:
+            return BASE_COLLECTION_NAME
+        return f"{BASE_COLLECTION_NAME}-{_model_slug(self.model_name)}"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(
+                model=self.model_name,
+                input=texts[start:start + self.batch_size]
+            )
+            vectors.extend(d.embedding for d in sorted(response.data, key=lambda d: d.index))
+        return vectors
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    sentence-transformers model running on CPU (PyTorch or ONNX runtime).
+
+    The model is loaded once and kept in memory; batches are encoded on a
+    bounded thread pool of `num_threads` threads, and each encode() call is
+    limited to `intra_op_threads` compute threads, so the pool as a whole
+    uses about as many threads as there are cores.
+    """
+
+    name = "local"
+    default_model_name = DEFAULT_LOCAL_EMBEDDING_MODEL
+
+    def __init__(self, model: str = LOCAL_EMBEDDING_MODEL, runtime: str = LOCAL_EMBEDDING_RUNTIME,
+                 batch_size: int = LOCAL_BATCH_SIZE, num_threads: int = LOCAL_EMBEDDING_THREADS,
+                 intra_op_threads: int = LOCAL_EMBEDDING_INTRA_OP_THREADS):
+        if runtime not in LOCAL_EMBEDDING_RUNTIMES:
+            raise ValueError(f"Unknown local embedding runtime '{runtime}', expected one of {LOCAL_EMBEDDING_RUNTIMES}")
+        self.model_name = model
+        self.runtime = runtime
+        self.batch_size = batch_size
+        self.intra_op_threads = intra_op_threads
+        self.executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="embedding")
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError as e:
+                        raise ImportError(
+                            "EMBEDDING_BACKEND=local requires the 'sentence-transformers' package"
+                        ) from e
+                    self._model = SentenceTransformer(
+                        self.model_name, device="cpu", backend=self.runtime,
+                        model_kwargs=self._runtime_kwargs()
+                    )
+        return self._model
+
+    def _runtime_kwargs(self) -> dict:
+        if self.runtime == "onnx":
+            import onnxruntime
+
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = self.intra_op_threads
+            return {"session_options": session_options}
+
+        # PyTorch : réglage global du process (pool de threads intra-op partagé)
+        import torch
+        torch.set_num_threads(self.intra_op_threads)
+        return {}
+
+    @property
+    def vector_size(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    @property
+    def max_input_tokens(self) -> int:
+        # max_seq_length inclut les tokens spéciaux ([CLS], [SEP]) ajoutés par encode()
+        return self.model.max_seq_length - 2
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).tolist()
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        vectors = []
+        for batch_vectors in self.executor.map(self._encode, batches):
+            vectors.extend(batch_vectors)
+        return vectors
+
+
+BACKENDS = {
+    OpenAIEmbeddingBackend.name: OpenAIEmbeddingBackend,
+    LocalEmbeddingBackend.name: LocalEmbeddingBackend,
+}
+
+_backends: dict = {}
+_backends_lock = threading.Lock()
+
+
+def get_embedding_backend(name: str = None) -> EmbeddingBackend:
+    """
+    Return the (shared) embedding backend instance.
+
+    Args:
+        name: "openai" or "local" (default: EMBEDDING_BACKEND env variable)
+    """
+    name = name or EMBEDDING_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}', expected one of {sorted(BACKENDS)}")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
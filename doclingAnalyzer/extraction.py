@@ -1,5 +1,14 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from docling.datamodel.base_models import InputFormat
 from docling.document_converter import DocumentConverter
+from docling_core.types.doc import DoclingDocument
+from serviceControl.cache import CONVERSION_CACHE_TTL, file_hash, shared_cache
+import multiprocessing
 import os
+import signal
+import threading
+import time
 
 # Disable HF Hub symlink warnings
 os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
@@ -8,11 +17,98 @@ os.environ["HF_HUB_DISABLE_SYMLINKS"] = "1"
 # Initialize the converter
 converter = DocumentConverter()
 
+# Pool de process pour les conversions (mode production, voir main.py)
+conversion_pool = None
+conversion_pool_size = 0
+_conversion_pool_lock = threading.Lock()
+
+# Signaux dont gunicorn installe les handlers dans le master : les process du
+# pool (forkés avant init_signals du worker) ne doivent pas les hériter
+INHERITED_SIGNALS = ("SIGHUP", "SIGINT", "SIGQUIT", "SIGTERM", "SIGTTIN", "SIGTTOU",
+                     "SIGUSR1", "SIGUSR2", "SIGWINCH", "SIGCHLD")
+
+
+def preload_models():
+    """Load the Docling PDF pipeline models now instead of at the first conversion."""
+    converter.initialize_pipeline(InputFormat.PDF)
+
+
+def _exit_with_parent(parent_pid: int):
+    # Worker tué (SIGKILL, OOM) : le process est rattaché à un autre parent, on s'arrête
+    while os.getppid() == parent_pid:
+        time.sleep(1)
+    os._exit(1)
+
+
+def _init_conversion_process(parent_pid: int):
+    for name in INHERITED_SIGNALS:
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.SIG_DFL)
+    threading.Thread(target=_exit_with_parent, args=(parent_pid,), daemon=True).start()
+
+    # Un thread de calcul par process : le parallélisme vient du pool
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def start_conversion_pool(num_processes: int, start_method: str = "fork"):
+    """
+    Start the process pool used by extract_document. With "fork", the
+    processes share the already loaded models with the parent (copy-on-write).
+    """
+    global conversion_pool, conversion_pool_size
+    conversion_pool = ProcessPoolExecutor(
+        max_workers=num_processes,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=_init_conversion_process,
+        initargs=(os.getpid(),)
+    )
+    conversion_pool_size = num_processes
+    # Le contexte "fork" lance tous les process à la première soumission
+    conversion_pool.submit(os.getpid).result()
+    return conversion_pool
+
+
+def _restart_conversion_pool(broken_pool: ProcessPoolExecutor):
+    """Replace a broken pool (a process died), once for all the threads that saw it break."""
+    with _conversion_pool_lock:
+        if conversion_pool is not broken_pool:
+            return
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+        # Le worker a maintenant des threads : "spawn" plutôt qu'un fork risqué
+        start_conversion_pool(conversion_pool_size, start_method="spawn")
+
+
+def _convert_in_pool(url_or_path: str) -> dict:
+    pool = conversion_pool
+    try:
+        return pool.submit(convert_document, url_or_path).result()
+    except BrokenProcessPool:
+        # Process du pool tué (OOM, signal) : pool reconstruit, un seul nouvel essai
+        print(f"Conversion pool broken while converting {url_or_path}, restarting it.")
+        _restart_conversion_pool(pool)
+        return conversion_pool.submit(convert_document, url_or_path).result()
+
+
+def convert_document(url_or_path: str) -> dict:
+    """Convert a document and return its picklable exports (runs in the pool)."""
+    document = converter.convert(url_or_path).document
+    return {
+        "markdown": document.export_to_markdown(),
+        "json": document.export_to_dict()
+    }
+
 
 def extract_document(url_or_path: str) -> dict:
     """
     Extract content from a PDF file or URL.
 
+    Local files are cached by content hash in the shared cache, so a file
+    already converted by any worker is not converted again.
+
     Args:
         url_or_path: URL or local path to the PDF
 
@@ -23,12 +119,30 @@ def extract_document(url_or_path: str) -> dict:
             "document": objet Document pour chunking
         }
     """
-    result = converter.convert(url_or_path)
-    document = result.document
+    key = file_hash(url_or_path) if os.path.isfile(url_or_path) else None
+    data = shared_cache.get("conversion", key) if key else None
+
+    if data is None:
+        if conversion_pool is not None:
+            data = _convert_in_pool(url_or_path)
+        else:
+            document = converter.convert(url_or_path).document
+            data = {
+                "markdown": document.export_to_markdown(),
+                "json": document.export_to_dict(),
+                "document": document
+            }
+        if key:
+            shared_cache.set("conversion", key, {"markdown": data["markdown"], "json": data["json"]},
+                             CONVERSION_CACHE_TTL)
+    elif isinstance(data["json"].get("origin"), dict):
+        # Le cache est indexé par contenu : le nom de fichier est celui de l'appel courant
+        data["json"]["origin"]["filename"] = os.path.basename(url_or_path)
+
     return {
-        "markdown": document.export_to_markdown(),
-        "json": document.export_to_dict(),
-        "document": document
+        "markdown": data["markdown"],
+        "json": data["json"],
+        "document": data.get("document") or DoclingDocument.model_validate(data["json"])
     }
 
 
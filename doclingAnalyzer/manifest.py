@@ -0,0 +1,136 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou inter-process indisponible
+    fcntl = None
+
+load_dotenv()
+
+MANIFEST_PATH = os.getenv("DOCUMENT_MANIFEST_PATH", "document_manifest.sqlite3")
+
+
+class DocumentManifest:
+    """
+    Local record of every indexed document, one SQLite row per document.
+
+    A row stores the number of chunks of the document and its stats; the
+    Qdrant point IDs are deterministic (point_id(project, document, index)),
+    so they are regenerated from num_chunks to delete or replace one
+    document by ID instead of scanning the collection with a payload filter.
+    Every operation touches only the rows of one document or project.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._document_locks = {}
+
+    def _connection(self) -> sqlite3.Connection:
+        # Une connexion par thread et par process (jamais partagée après un fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " collection TEXT NOT NULL, project_id TEXT NOT NULL, document_id TEXT NOT NULL,"
+                " num_chunks INTEGER NOT NULL, stats TEXT NOT NULL,"
+                " created_at TEXT NOT NULL, updated_at TEXT NOT NULL,"
+                " PRIMARY KEY (collection, project_id, document_id))"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def document_lock(self, collection: str, project_id: str, document_id: str):
+        """
+        Exclusive lock on one document, across threads and worker processes.
+        Hold it from reading the previous entry to writing the new one.
+        """
+        key = f"{collection}/{project_id}/{document_id}"
+        with self._lock:
+            lock = self._document_locks.setdefault(key, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            lock_dir = f"{self.path}.locks"
+            os.makedirs(lock_dir, exist_ok=True)
+            lock_path = os.path.join(lock_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".lock")
+            with open(lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _entry(row) -> dict:
+        document_id, num_chunks, stats, created_at, updated_at = row
+        return {
+            **json.loads(stats),
+            "document_id": document_id,
+            "num_chunks": num_chunks,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def _select(self, where: str, params: tuple) -> dict:
+        rows = self._connection().execute(
+            "SELECT document_id, num_chunks, stats, created_at, updated_at FROM documents WHERE " + where,
+            params
+        ).fetchall()
+        return {row[0]: self._entry(row) for row in rows}
+
+    def list_documents(self, collection: str, project_id: str) -> dict:
+        return self._select("collection = ? AND project_id = ?", (collection, project_id))
+
+    def get_document(self, collection: str, project_id: str, document_id: str):
+        return self._select(
+            "collection = ? AND project_id = ? AND document_id = ?", (collection, project_id, document_id)
+        ).get(document_id)
+
+    def set_document(self, collection: str, project_id: str, document_id: str, num_chunks: int, **stats) -> dict:
+        now = datetime.now(timezone.utc).isoformat()
+        self._connection().execute(
+            "INSERT INTO documents (collection, project_id, document_id, num_chunks, stats, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (collection, project_id, document_id) DO UPDATE SET"
+            " num_chunks = excluded.num_chunks, stats = excluded.stats, updated_at = excluded.updated_at",
+            (collection, project_id, document_id, num_chunks, json.dumps(stats), now, now)
+        )
+        return self.get_document(collection, project_id, document_id)
+
+    def _remove(self, where: str, params: tuple) -> dict:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = self._select(where, params)
+            conn.execute("DELETE FROM documents WHERE " + where, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return removed
+
+    def remove_document(self, collection: str, project_id: str, document_id: str):
+        return self._remove(
+            "collection = ? AND project_id = ? AND document_id = ?", (collection, project_id, document_id)
+        ).get(document_id)
+
+    def remove_project(self, collection: str, project_id: str):
+        return self._remove("collection = ? AND project_id = ?", (collection, project_id)) or None
+
+
+manifest = DocumentManifest()
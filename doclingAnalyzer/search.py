@@ -1,6 +1,6 @@
 from qdrant_client import QdrantClient
 from qdrant_client.models import Filter, FieldCondition, MatchValue
-from openai import OpenAI
+from doclingAnalyzer.embedding_backends import get_embedding_backend
 import os
 from dotenv import load_dotenv
 import pandas as pd
@@ -8,24 +8,19 @@ import pandas as pd
 load_dotenv()
 
 # --- Config ---
-COLLECTION_NAME = "MindTrace-documents"
+embedding_backend = get_embedding_backend()
+COLLECTION_NAME = embedding_backend.collection_name
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
 qdrant_client = QdrantClient(
     url=QDRANT_URL,
     api_key=QDRANT_API_KEY,
-    https=True
+    https=os.getenv("QDRANT_HTTPS", "1") == "1"
 )
 
-openai_client = OpenAI()
-
 def get_query_embedding(query: str):
-    response = openai_client.embeddings.create(
-        model="text-embedding-3-small",
-        input=query
-    )
-    return response.data[0].embedding
+    return embedding_backend.embed_query(query)
 
 def search_qdrant(query: str, project_id: str, limit: int = 3):
     vector = get_query_embedding(query)
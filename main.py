@@ -0,0 +1,93 @@
+"""
+Production entry point of the MindTrace AI Service (Linux / macOS).
+
+    python main.py --workers 4 --bind 0.0.0.0:8000
+
+Runs gunicorn with uvicorn workers:
+- the Docling models and the chunking tokenizer are loaded once in the master,
+  before the workers are forked, so all workers share them copy-on-write;
+- each worker converts documents in its own process pool, sized so that
+  all workers together use one conversion process per core;
+- embeddings, conversions and answers are cached in a local SQLite file
+  (CACHE_PATH) shared by all workers.
+
+For development, a single process with auto-reload is enough:
+
+    uvicorn MindTrace_AI_API:app --reload
+"""
+import argparse
+import gc
+import os
+
+
+def preload_models():
+    """Load the heavy models in the master process, before fork."""
+    from doclingAnalyzer import chunking  # noqa: F401  (tokenizer du chunker + DocumentConverter)
+    from doclingAnalyzer.extraction import preload_models as preload_docling
+    from doclingAnalyzer.embedding_backends import EMBEDDING_BACKEND, get_embedding_backend
+
+    preload_docling()
+    if EMBEDDING_BACKEND == "local":
+        get_embedding_backend().model
+
+    # Objets chargés figés hors du GC : pas de copie des pages lors des collectes
+    gc.freeze()
+
+
+def run(workers: int, bind: str, timeout: int):
+    from gunicorn.app.base import BaseApplication
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    cores = os.cpu_count() or 1
+    pool_size = max(1, cores // workers)
+
+    # Limites par process (admission, débit OpenAI) réparties entre les workers
+    os.environ.setdefault("EXTRACT_CONCURRENCY", str(pool_size))
+    os.environ.setdefault("PROCESS_CONCURRENCY", str(pool_size))
+    total_rate = float(os.getenv("OPENAI_REQUESTS_PER_SECOND", "8"))
+    os.environ["OPENAI_REQUESTS_PER_SECOND"] = str(total_rate / workers)
+    # Cœurs répartis entre workers et threads d'encodage du backend local
+    embedding_threads = int(os.getenv("LOCAL_EMBEDDING_THREADS", str(min(4, cores))))
+    os.environ.setdefault("LOCAL_EMBEDDING_INTRA_OP_THREADS", str(max(1, cores // workers // embedding_threads)))
+    total_burst = int(os.getenv("OPENAI_BURST", "16"))
+    os.environ["OPENAI_BURST"] = str(max(1, total_burst // workers))
+    total_tokens = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "1000000"))
+    os.environ["OPENAI_TOKENS_PER_MINUTE"] = str(total_tokens // workers)
+
+    def post_fork(server, worker):
+        # Dans le worker, avant le chargement de l'app (pas encore de threads)
+        from doclingAnalyzer.extraction import start_conversion_pool
+        from serviceControl.cache import shared_cache
+        start_conversion_pool(pool_size)
+        shared_cache.prune()
+
+    class MindTraceApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", bind)
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("timeout", timeout)
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            # Importée dans chaque worker : clients HTTP / Qdrant jamais partagés entre process
+            from MindTrace_AI_API import app
+            return app
+
+    preload_models()
+    MindTraceApplication().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the MindTrace AI Service in production mode")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--bind", default=os.getenv("BIND", "0.0.0.0:8000"))
+    parser.add_argument("--timeout", type=int, default=600, help="worker timeout in seconds (long conversions)")
+    args = parser.parse_args()
+
+    run(args.workers, args.bind, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+import asyncio
+import os
+
+load_dotenv()
+
+# -----------------------------
+# Admission config (par endpoint)
+# -----------------------------
+ADMISSION_LIMITS = {
+    # endpoint: (requêtes simultanées, taille max de la file, attente max en secondes)
+    # conversion Docling : extract-document et extract-and-chunk
+    "extraction": (int(os.getenv("EXTRACT_CONCURRENCY", "2")), int(os.getenv("EXTRACT_QUEUE", "8")), 120.0),
+    "process-document": (int(os.getenv("PROCESS_CONCURRENCY", "2")), int(os.getenv("PROCESS_QUEUE", "8")), 300.0),
+    "search": (int(os.getenv("SEARCH_CONCURRENCY", "16")), int(os.getenv("SEARCH_QUEUE", "64")), 10.0),
+    "ask": (int(os.getenv("ASK_CONCURRENCY", "8")), int(os.getenv("ASK_QUEUE", "32")), 30.0),
+    "analyze-spec-changes": (int(os.getenv("SPEC_CONCURRENCY", "4")), int(os.getenv("SPEC_QUEUE", "16")), 30.0),
+}
+
+
+class ConcurrencyLimiter:
+    """
+    Bounded concurrency with a bounded wait queue for one endpoint.
+
+    Requests beyond `max_concurrent` wait up to `timeout` seconds; when
+    `max_concurrent + max_queue` requests are already admitted (running or
+    waiting), new ones are rejected right away with a 503 so the client can
+    retry later.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.waiting = 0
+        self.active = 0
+        self._semaphore = None
+
+    def _reject(self, reason: str):
+        raise HTTPException(
+            status_code=503,
+            detail=f"'{self.name}' is overloaded ({reason}), retry later",
+            headers={"Retry-After": "5"}
+        )
+
+    async def run(self, func, *args):
+        """Await `func(*args)` once a slot is free."""
+        # Semaphore créé dans la boucle d'événements qui l'utilise
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        # Compteurs du limiteur, mis à jour avant tout await : les requêtes
+        # arrivées dans le même tour de boucle sont bien comptées
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            self._reject("queue full")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._reject(f"waited more than {self.timeout:g}s")
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            return await func(*args)
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight requests: the first caller for a key runs
+    the computation, the others await the same result (or exception).
+    """
+
+    def __init__(self):
+        self._inflight: dict = {}
+
+    async def run(self, key, coroutine_factory):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coroutine_factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield : l'annulation d'un client ne doit pas annuler le calcul partagé
+        return await asyncio.shield(task)
+
+
+limiters = {name: ConcurrencyLimiter(name, *limits) for name, limits in ADMISSION_LIMITS.items()}
+single_flight = SingleFlight()
+
+
+async def admit(endpoint: str, key, func, *args):
+    """
+    Run the blocking `func(*args)` in the thread pool, behind the endpoint's
+    concurrency limit and coalesced with identical in-flight requests (same key).
+    """
+    limiter = limiters[endpoint]
+    return await single_flight.run(
+        (endpoint, key),
+        lambda: limiter.run(run_in_threadpool, func, *args)
+    )
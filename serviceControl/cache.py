@@ -0,0 +1,183 @@
+from dotenv import load_dotenv
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+load_dotenv()
+
+CACHE_PATH = os.getenv("CACHE_PATH", "mindtrace_cache.sqlite3")
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", str(7 * 24 * 3600)))  # 0 = pas d'expiration
+CONVERSION_CACHE_TTL = float(os.getenv("CONVERSION_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "100000"))
+CACHE_PRUNE_EVERY = int(os.getenv("CACHE_PRUNE_EVERY", "500"))  # appels à set_many entre deux prune()
+
+# Compteurs de version : jamais évincés (sinon des réponses périmées redeviendraient valides)
+PINNED_NAMESPACES = ("project-version",)
+
+
+def cache_key(*parts) -> str:
+    """sha256 of the given parts, used as cache key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_hash(path_or_url: str) -> str:
+    """sha256 of a local file, or of the URL itself for remote documents."""
+    if not os.path.isfile(path_or_url):
+        return hashlib.sha256(path_or_url.encode("utf-8")).hexdigest()
+    digest = hashlib.sha256()
+    with open(path_or_url, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SharedCache:
+    """
+    Key/value cache stored in a local SQLite file (WAL mode).
+
+    All workers and processes on the machine open the same file, so a value
+    computed by one worker (embedding, conversion, answer) is reused by the
+    others. Values are pickled; entries expire after their TTL, and prune()
+    (run every `prune_every` writes) keeps at most `max_entries` rows,
+    evicting the least recently written ones.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, enabled: bool = CACHE_ENABLED,
+                 max_entries: int = CACHE_MAX_ENTRIES, prune_every: int = CACHE_PRUNE_EVERY):
+        self.path = path
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Une connexion par thread et par process (jamais partagée après un fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+                " expires_at REAL, PRIMARY KEY (namespace, key))"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, namespace: str, key: str, default=None):
+        if not self.enabled:
+            return default
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return pickle.loads(row[0])
+
+    def get_many(self, namespace: str, keys: list) -> dict:
+        """Return {key: value} for the keys found (missing or expired keys are absent)."""
+        if not self.enabled or not keys:
+            return {}
+        found = {}
+        now = time.time()
+        conn = self._connection()
+        # Limite SQLite sur le nombre de paramètres : par lots
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, value, expires_at FROM cache WHERE namespace = ? AND key IN ({','.join('?' * len(batch))})",
+                (namespace, *batch)
+            ).fetchall()
+            for key, value, expires_at in rows:
+                if expires_at is None or expires_at >= now:
+                    found[key] = pickle.loads(value)
+        return found
+
+    def set(self, namespace: str, key: str, value, ttl: float = 0):
+        self.set_many(namespace, {key: value}, ttl)
+
+    def set_many(self, namespace: str, items: dict, ttl: float = 0):
+        if not self.enabled or not items:
+            return
+        expires_at = time.time() + ttl if ttl else None
+        self._connection().executemany(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            [(namespace, key, pickle.dumps(value), expires_at) for key, value in items.items()]
+        )
+        with self._writes_lock:
+            self._writes += 1
+            due = self.prune_every > 0 and self._writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def incr(self, namespace: str, key: str) -> int:
+        """Atomically increment an integer counter and return its new value."""
+        if not self.enabled:
+            return 0
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            value = self.get(namespace, key, 0) + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, NULL)",
+                (namespace, key, pickle.dumps(value))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def prune(self) -> int:
+        """
+        Delete expired entries, then the oldest ones beyond `max_entries`.
+
+        Returns:
+            int: number of removed entries
+        """
+        if not self.enabled:
+            return 0
+        conn = self._connection()
+        removed = conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        ).rowcount
+
+        pinned = ",".join("?" * len(PINNED_NAMESPACES))
+        count = conn.execute(
+            f"SELECT COUNT(*) FROM cache WHERE namespace NOT IN ({pinned})", PINNED_NAMESPACES
+        ).fetchone()[0]
+        excess = count - self.max_entries
+        if self.max_entries > 0 and excess > 0:
+            # INSERT OR REPLACE attribue un nouveau rowid : ordre = dernière écriture
+            removed += conn.execute(
+                f"DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache WHERE namespace NOT IN ({pinned})"
+                " ORDER BY rowid LIMIT ?)",
+                (*PINNED_NAMESPACES, excess)
+            ).rowcount
+        return removed
+
+
+shared_cache = SharedCache()
+
+
+def project_version(collection_name: str, project_id: str) -> int:
+    """Version of a project's index, bumped on every write so cached answers go stale."""
+    return shared_cache.get("project-version", f"{collection_name}/{project_id}", 0)
+
+
+def bump_project_version(collection_name: str, project_id: str) -> int:
+    return shared_cache.incr("project-version", f"{collection_name}/{project_id}")
@@ -0,0 +1,99 @@
+from dotenv import load_dotenv
+import json
+import math
+import os
+import threading
+import time
+
+load_dotenv()
+
+# Débit sortant vers OpenAI, partagé par tous les clients du process
+OPENAI_REQUESTS_PER_SECOND = float(os.getenv("OPENAI_REQUESTS_PER_SECOND", "8"))
+OPENAI_BURST = int(os.getenv("OPENAI_BURST", "16"))
+# Quota en tokens par minute (TPM) : 0 = pas de limite en tokens
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "1000000"))
+CHARS_PER_TOKEN = 4  # estimation usuelle pour l'anglais / le français
+
+
+class TokenBucket:
+    """Thread-safe token bucket (`rate` tokens per second, at most `capacity`)."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """Block until `tokens` are available; False if `timeout` expires first."""
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+openai_rate_limiter = TokenBucket(OPENAI_REQUESTS_PER_SECOND, OPENAI_BURST)
+openai_token_limiter = TokenBucket(OPENAI_TOKENS_PER_MINUTE / 60, OPENAI_TOKENS_PER_MINUTE)
+
+
+def _estimate_tokens(text) -> int:
+    if isinstance(text, str):
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    if isinstance(text, list):  # entrée déjà tokenisée, ou contenu multi-parties
+        return sum(_estimate_tokens(part) if not isinstance(part, int) else 1 for part in text)
+    if isinstance(text, dict):
+        return _estimate_tokens(text.get("text"))
+    return 0
+
+
+def estimate_request_tokens(request) -> int:
+    """
+    Estimate the tokens an OpenAI request counts against the TPM quota:
+    the embedding inputs or the chat messages, plus `max_tokens` if set.
+    """
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, UnicodeDecodeError):
+        return 0
+    if not isinstance(body, dict):
+        return 0
+    if "input" in body:
+        inputs = body["input"]
+        return _estimate_tokens(inputs if isinstance(inputs, list) else [inputs])
+    tokens = sum(_estimate_tokens(message.get("content")) for message in body.get("messages", []))
+    return tokens + int(body.get("max_tokens") or body.get("max_completion_tokens") or 0)
+
+
+def _throttle_openai_request(request):
+    # Ne lève jamais d'exception : le SDK la prendrait pour une erreur de connexion
+    # et réessaierait. L'attente reste bornée car les endpoints qui appellent
+    # OpenAI sont eux-mêmes limités en concurrence (serviceControl/admission.py).
+    openai_rate_limiter.acquire()
+    if OPENAI_TOKENS_PER_MINUTE > 0:
+        # Une requête plus grosse que le quota d'une minute attend un seau plein
+        tokens = min(estimate_request_tokens(request), OPENAI_TOKENS_PER_MINUTE)
+        if tokens:
+            openai_token_limiter.acquire(tokens)
+
+
+def create_openai_client():
+    """
+    OpenAI client whose HTTP requests (retries included) all go through the
+    shared token buckets, so the whole process stays under the API rate
+    limits: requests per second, and estimated input tokens per minute.
+    """
+    from openai import OpenAI, DefaultHttpxClient
+
+    return OpenAI(http_client=DefaultHttpxClient(event_hooks={"request": [_throttle_openai_request]}))